@@ -1,15 +1,14 @@
 import os
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, g
 from flask_cors import CORS
-import kb_manager
 from werkzeug.utils import secure_filename
 import json
-import shutil
 import requests
 from constants import TANDOOR_API_KEY
 
-# Import the single RAGEngine instance from rag.py
-from rag import get_rag_response, list_recipes, rag_engine_instance
+# Import the tenant registry that owns the per-tenant RAG engines
+from rag import get_rag_response, list_recipes, tenant_registry
+from tenant_registry import DEFAULT_TENANT, is_valid_tenant_id, tenant_docs_path, tenant_vectorstore_path
 # Remove direct import of update_vector_store or related things from create_vector_store
 import constants as constants # Import constants for path definitions
 
@@ -22,13 +21,15 @@ CORS(app, supports_credentials=True)
 app.secret_key = os.urandom(24) 
 
 # --- Configuration ---
-# Define the upload folder relative to the app's root
+# Define the upload folder relative to the app's root (default tenant; other tenants use tenant_docs_path)
 UPLOAD_FOLDER = constants.DOCS_PATH 
 # Define allowed file extensions
 ALLOWED_EXTENSIONS = {'json'} 
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 # Optional: Limit file size (e.g., 16MB)
+# Header naming the household (tenant) whose knowledge base a request targets
+TENANT_HEADER = 'X-Tenant-ID'
 
 # --- Helper Function ---
 def allowed_file(filename):
@@ -36,6 +37,21 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@app.before_request
+def resolve_tenant():
+    """Resolves the tenant for the request from the header, falling back to the default tenant."""
+    tenant_id = request.headers.get(TENANT_HEADER) or DEFAULT_TENANT
+    if not is_valid_tenant_id(tenant_id):
+        return jsonify({"error": f"Invalid tenant id in '{TENANT_HEADER}' header"}), 400
+    g.tenant_id = tenant_id
+
+def tenant_session():
+    """Returns the session state (chat history, selected recipe) of the request's tenant.
+
+    Callers that modify it must set session.modified, since it is a nested dict.
+    """
+    return session.setdefault('tenants', {}).setdefault(g.tenant_id, {})
+
 # --- API Routes --- (Prefixed with /api)
 
 @app.route('/') # Keep a basic root route for testing
@@ -45,18 +61,18 @@ def root():
 @app.route('/api/init', methods=['GET'])
 def init_chat():
     """Provides initial data for the frontend: recipes and history."""
-    recipes = list_recipes()
+    recipes = list_recipes(g.tenant_id)
     print(f"Initializing chat. Recipes found: {recipes}") # Debugging
-    # Initialize chat history and selected recipe in session if not present
-    if 'chat_history' not in session:
-        session['chat_history'] = []
-    if 'selected_recipe' not in session: # Initialize selected_recipe
-        session['selected_recipe'] = None 
+    # Initialize the tenant's chat history and selected recipe in session if not present
+    state = tenant_session()
+    state.setdefault('chat_history', [])
+    state.setdefault('selected_recipe', None) # Initialize selected_recipe
+    session.modified = True
 
     return jsonify({
         'recipes': recipes,
-        'chat_history': session.get('chat_history', []), # Use .get for safety
-        'selected_recipe': session.get('selected_recipe', None) # Return selected recipe
+        'chat_history': state.get('chat_history', []), # Use .get for safety
+        'selected_recipe': state.get('selected_recipe', None) # Return selected recipe
     })
 
 @app.route('/api/ask', methods=['POST'])
@@ -72,15 +88,16 @@ def ask():
     if not user_question:
         return jsonify({"error": "Missing 'question' in request"}), 400
 
-    # Retrieve serializable chat history from session
-    chat_history = session.get('chat_history', [])
+    # Retrieve the tenant's serializable chat history from session
+    state = tenant_session()
+    chat_history = state.get('chat_history', [])
 
     # Get response from RAG model (updates chat_history in-place)
     # Pass the selected recipe to the RAG function
-    answer = get_rag_response(user_question, chat_history, selected_recipe_filename=selected_recipe)
+    answer = get_rag_response(user_question, chat_history, selected_recipe_filename=selected_recipe, tenant_id=g.tenant_id)
 
     # Save the updated history back to session
-    session['chat_history'] = chat_history
+    state['chat_history'] = chat_history
     session.modified = True
 
     # Return the latest answer and the updated history
@@ -102,16 +119,17 @@ def select_recipe():
 
     # Validate? Maybe check if filename exists in list_recipes()?
     # For now, just trust the frontend.
-    session['selected_recipe'] = recipe_filename
+    tenant_session()['selected_recipe'] = recipe_filename
     session.modified = True
-    print(f"Session selected_recipe set to: {session['selected_recipe']}") # Debugging
+    print(f"Session selected_recipe for tenant '{g.tenant_id}' set to: {recipe_filename}") # Debugging
     return jsonify({"message": "Recipe selection updated.", "selected_recipe": recipe_filename})
 
 @app.route('/api/clear', methods=['POST'])
 def clear_history():
-    """Clears the chat history and selected recipe for the current session."""
-    session.pop('chat_history', None) # Use pop for safety
-    session.pop('selected_recipe', None) # Also clear the selected recipe
+    """Clears the chat history and selected recipe of the current tenant in this session."""
+    state = tenant_session()
+    state.pop('chat_history', None) # Use pop for safety
+    state.pop('selected_recipe', None) # Also clear the selected recipe
     session.modified = True # Ensure changes are saved
     return jsonify({"message": "Chat history and recipe selection cleared."}) # Return success message
 
@@ -129,18 +147,18 @@ def upload_recipe():
 
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename) # Sanitize filename
-        # Ensure the upload folder exists
-        if not os.path.exists(app.config['UPLOAD_FOLDER']):
-             os.makedirs(app.config['UPLOAD_FOLDER'])
-             print(f"Created upload directory: {app.config['UPLOAD_FOLDER']}")
-
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        upload_folder = tenant_docs_path(g.tenant_id)
+        save_path = os.path.join(upload_folder, filename)
         
         # Basic JSON validation before saving (optional but recommended)
         try:
             # Read content without saving first
             content = file.read().decode('utf-8') 
             json.loads(content) # Try parsing
+            # Ensure the tenant's upload folder exists; this is what creates a new tenant
+            if not os.path.exists(upload_folder):
+                 os.makedirs(upload_folder)
+                 print(f"Created upload directory: {upload_folder}")
             # If parsing works, save the content
             with open(save_path, 'w', encoding='utf-8') as f:
                 f.write(content)
@@ -157,19 +175,15 @@ def upload_recipe():
              print("seeking file")
 
 
-        # --- Update Vector Store on Disk --- 
-        print("Triggering knowledge base update on disk...")
-        # Use the static method from KnowledgeBaseManager
-        # It uses paths defined in constants.py by default
-        update_success = kb_manager.KnowledgeBaseManager.update_kb()
+        # --- Update Vector Store on Disk and Reload the Tenant's Engine --- 
+        print(f"Triggering knowledge base update for tenant '{g.tenant_id}'...")
+        # Only this tenant's index is rebuilt; other tenants keep serving queries
+        update_success = tenant_registry.rebuild(g.tenant_id)
 
         if update_success:
             print("Knowledge base updated successfully on disk.")
-            # --- Reload Vector Store in RAG Engine --- 
-            print("Reloading vector store in RAG engine...")
-            rag_engine_instance.reload_vectorstore() # Reload the engine's store
             
-            updated_recipes = list_recipes() 
+            updated_recipes = list_recipes(g.tenant_id) 
             return jsonify({
                 "message": f"Recipe '{filename}' uploaded and knowledge base updated.",
                 "filename": filename,
@@ -202,16 +216,17 @@ def handle_transcription():
 
     # You can add further processing here if needed in the future
 
-    # Retrieve serializable chat history from session
-    chat_history = session.get('chat_history', [])
+    # Retrieve the tenant's serializable chat history from session
+    state = tenant_session()
+    chat_history = state.get('chat_history', [])
 
     selected_recipe = None # TODO: figure out how to get selected recipe in voice context
     # Get response from RAG model (updates chat_history in-place)
     # Pass the selected recipe to the RAG function
-    answer = get_rag_response(user_question, chat_history, selected_recipe_filename=selected_recipe)
+    answer = get_rag_response(user_question, chat_history, selected_recipe_filename=selected_recipe, tenant_id=g.tenant_id)
 
     # Save the updated history back to session
-    session['chat_history'] = chat_history
+    state['chat_history'] = chat_history
     session.modified = True
 
 
@@ -226,36 +241,28 @@ def handle_transcription():
 # --- New Remove Vector Store Endpoint ---
 @app.route('/api/remove_vector_store', methods=['POST']) # Using POST for action
 def remove_vector_store():
-    """Removes the existing vector store directory."""
-    vectorstore_path = constants.VECTORSTORE_PATH # Use path from constants
+    """Removes the tenant's existing vector store directory."""
+    vectorstore_path = tenant_vectorstore_path(g.tenant_id)
     print(f"Attempting to remove vector store at: {vectorstore_path}")
-    store_existed = os.path.exists(vectorstore_path)
     try:
+        # Removes the directory and evicts the tenant's engine (even if it didn't exist),
+        # so the next request rebuilds the store from the tenant's recipe files.
+        store_existed = tenant_registry.remove_vectorstore(g.tenant_id)
         if store_existed:
-            shutil.rmtree(vectorstore_path)
             print(f"Vector store directory '{vectorstore_path}' removed successfully.")
         else:
              print(f"Vector store directory '{vectorstore_path}' not found. Nothing to remove.")
 
-        # --- Reload RAG Engine's Store (even if it didn't exist) ---
-        # This tells the engine to attempt loading, which will fail if the dir is gone,
-        # effectively clearing its internal store.
-        print("Reloading vector store in RAG engine (will clear if removed)...")
-        rag_engine_instance.reload_vectorstore()
-
         # If the store existed and was removed, return 200 OK.
         # If it didn't exist, also return 200 OK.
-        message = "Vector store removed successfully and engine reloaded." if store_existed else "Vector store not found, engine state refreshed."
+        message = "Vector store removed successfully and engine unloaded." if store_existed else "Vector store not found, engine state refreshed."
         return jsonify({"message": message}), 200
 
     except OSError as e:
         print(f"Error removing vector store directory '{vectorstore_path}': {e}")
-        # Attempt to reload engine even on error, maybe state is recoverable?
-        rag_engine_instance.reload_vectorstore()
         return jsonify({"error": f"Failed to remove vector store: {e}"}), 500
     except Exception as e:
         print(f"An unexpected error occurred while removing vector store: {e}")
-        rag_engine_instance.reload_vectorstore()
         return jsonify({"error": "An unexpected error occurred."}), 500
 
 # --- New Remove Single Recipe Endpoint ---
@@ -271,8 +278,8 @@ def remove_recipe():
     if not filename_to_remove:
         return jsonify({"error": "Missing 'filename' in request body"}), 400
 
-    # Use constant for base path
-    base_path = os.path.abspath(constants.DOCS_PATH)
+    # Use the tenant's recipes folder as base path
+    base_path = os.path.abspath(tenant_docs_path(g.tenant_id))
     target_path = os.path.abspath(os.path.join(base_path, filename_to_remove))
 
     # Security check
@@ -293,18 +300,16 @@ def remove_recipe():
         # --- Update Vector Store on Disk (regardless of whether file existed) --- 
         # This ensures consistency if the file was somehow deleted externally.
         print("Triggering knowledge base update on disk after removal attempt...")
-        update_success = kb_manager.KnowledgeBaseManager.update_kb()
+        update_success = tenant_registry.rebuild(g.tenant_id)
 
         if update_success:
             print("Knowledge base updated successfully on disk.")
-            # --- Reload Vector Store in RAG Engine --- 
-            print("Reloading vector store in RAG engine...")
-            rag_engine_instance.reload_vectorstore()
             
-            updated_recipes = list_recipes()
+            updated_recipes = list_recipes(g.tenant_id)
             cleared_selection = False
-            if session.get('selected_recipe') == filename_to_remove:
-                 session['selected_recipe'] = None
+            state = tenant_session()
+            if state.get('selected_recipe') == filename_to_remove:
+                 state['selected_recipe'] = None
                  session.modified = True
                  cleared_selection = True
             
@@ -319,9 +324,7 @@ def remove_recipe():
                 }), status_code
         else:
             print("Knowledge base update failed after recipe removal attempt.")
-             # Even if KB update fails, try to reload the engine with whatever is on disk currently
-            print("Attempting to reload RAG engine with potentially stale index...")
-            rag_engine_instance.reload_vectorstore() 
+            # The registry has already reloaded the engine with whatever is on disk currently
             # Report error, but the file might be gone and index stale
             error_message = "Recipe file processed, but failed to update knowledge base. Index may be inconsistent."
             if not file_existed: error_message = "Recipe file not found, and failed to update knowledge base."
@@ -330,14 +333,12 @@ def remove_recipe():
     except OSError as e:
         print(f"Error removing recipe file '{target_path}': {e}")
         # Attempt KB update and engine reload even on file removal error
-        kb_manager.KnowledgeBaseManager.update_kb() 
-        rag_engine_instance.reload_vectorstore()
+        tenant_registry.rebuild(g.tenant_id)
         return jsonify({"error": f"Failed to remove recipe file: {e}"}), 500
     except Exception as e:
         print(f"An unexpected error occurred during recipe removal: {e}")
         # Attempt KB update and engine reload even on other errors
-        kb_manager.KnowledgeBaseManager.update_kb() 
-        rag_engine_instance.reload_vectorstore()
+        tenant_registry.rebuild(g.tenant_id)
         return jsonify({"error": "An unexpected error occurred during recipe removal."}), 500
 
 @app.route('/data/reload-source', methods=['POST'])
@@ -1,6 +1,8 @@
 import shutil
 import os
 import json
+import threading
+import uuid
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
@@ -9,6 +11,20 @@ import constants as constants # Import constants
 
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
+# The embedding model is shared by every tenant, so it is only loaded once per process
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+def get_embeddings():
+    """Returns the process-wide embedding model, loading it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}")
+                _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    return _embeddings
+
 # --- Helper function moved outside the class ---
 def format_recipe(recipe):
     """Formats the recipe JSON data into a string for embedding."""
@@ -37,17 +53,14 @@ class KnowledgeBaseManager:
 
     @staticmethod
     def update_kb(kb_path=constants.VECTORSTORE_PATH, ground_truth_path=constants.DOCS_PATH) -> bool:
-        """Reads all JSON recipes, creates embeddings, and saves/overwrites the vector store on disk."""
+        """Reads all JSON recipes, creates embeddings, and saves/overwrites the vector store on disk.
+
+        The new store is built in a scratch directory next to kb_path and swapped in once it is
+        complete, so the previous store stays loadable for the whole rebuild and survives a failure.
+        """
+        kb_path = os.path.normpath(kb_path) # A trailing separator would put the scratch dirs inside kb_path
         print(f"Starting vector store update process for path: {kb_path}")
-        # Consider removing the existing store first if overwriting is intended
-        if os.path.exists(kb_path):
-            try:
-                shutil.rmtree(kb_path)
-                print(f"Removed existing vector store at '{kb_path}' before update.")
-            except OSError as e:
-                print(f"Error removing existing vector store at '{kb_path}': {e}")
-                # Decide if this should be a fatal error (return False) or just a warning
-                # return False # Uncomment if removal failure should stop the update
+        build_path = f"{kb_path}.build-{uuid.uuid4().hex}"
 
         documents = []
         try:
@@ -72,27 +85,43 @@ class KnowledgeBaseManager:
                     print(f"Warning: Error processing file {recipe_file}: {e}")
 
             if not documents:
-                print("No valid documents found. Vector store will not be created/updated.")
-                # Ensure an empty directory exists if needed by downstream loaders
-                if not os.path.exists(kb_path):
-                    os.makedirs(kb_path)
-                # Or handle the case where no vector store exists gracefully later
-                return True # Successful in the sense that there was nothing to do
-
-            print(f"Processing {len(documents)} documents for vector store.")
-            embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
-            vectorstore = FAISS.from_documents(documents, embeddings)
-            vectorstore.save_local(kb_path)
+                print("No valid documents found. Vector store will be emptied.")
+                # Swap in an empty directory so downstream loaders see no store
+                os.makedirs(build_path)
+            else:
+                print(f"Processing {len(documents)} documents for vector store.")
+                vectorstore = FAISS.from_documents(documents, get_embeddings())
+                vectorstore.save_local(build_path)
+
+            KnowledgeBaseManager._swap_in(build_path, kb_path)
             print(f"Vector store successfully created/updated at '{kb_path}'.")
             return True # Indicate success
 
         except Exception as e:
             print(f"An error occurred during vector store update: {e}")
-            # Clean up potentially partially created store?
-            # if os.path.exists(kb_path):
-            #     shutil.rmtree(kb_path) # Optional: remove partial store on failure
+            # Drop the partial build; the previous store at kb_path is left untouched
+            shutil.rmtree(build_path, ignore_errors=True)
             return False # Indicate failure
 
+    @staticmethod
+    def _swap_in(build_path, kb_path):
+        """Replaces kb_path with the freshly built store at build_path using directory renames."""
+        kb_path = os.path.normpath(kb_path)
+        parent = os.path.dirname(os.path.abspath(kb_path))
+        os.makedirs(parent, exist_ok=True)
+        if not os.path.exists(kb_path):
+            os.rename(build_path, kb_path)
+            return
+
+        stale_path = f"{kb_path}.stale-{uuid.uuid4().hex}"
+        os.rename(kb_path, stale_path)
+        try:
+            os.rename(build_path, kb_path)
+        except OSError:
+            os.rename(stale_path, kb_path) # Put the previous store back
+            raise
+        shutil.rmtree(stale_path, ignore_errors=True)
+
     @staticmethod
     def load_vectorstore(kb_path=constants.VECTORSTORE_PATH):
         """Loads the FAISS vector store from the specified path."""
@@ -103,9 +132,8 @@ class KnowledgeBaseManager:
 
         print(f"Loading vector store from: {kb_path}")
         try:
-            embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
             vectorstore = FAISS.load_local(
-                kb_path, embeddings, allow_dangerous_deserialization=True
+                kb_path, get_embeddings(), allow_dangerous_deserialization=True
             )
             print("Vector store loaded successfully.")
             return vectorstore
@@ -1,45 +1,38 @@
 import os
 import glob
 import constants
-from rag_engine import RAGEngine # Import the new RAGEngine class
-import kb_manager
+from tenant_registry import TenantRegistry, DEFAULT_TENANT, tenant_docs_path
 
-# --- init RAG engine ---
+# --- init tenant registry ---
 
-print(f"{constants.BUILD} - Creating RAG Engine instance...")
+print(f"{constants.BUILD} - Creating tenant registry...")
+# Tenant engines (and their vector stores) are loaded lazily on first use
+tenant_registry = TenantRegistry()
+print(f"{constants.BUILD} - Tenant registry created (budget: {tenant_registry.max_bytes} bytes).")
 
-if not os.path.exists(constants.VECTORSTORE_PATH) or not os.listdir(constants.VECTORSTORE_PATH):
-    print(f"{constants.BUILD} - Vector store not found at '{constants.VECTORSTORE_PATH}'. Building initial store...")
+def get_rag_response(user_question: str, serializable_chat_history: list, selected_recipe_filename: str | None = None, tenant_id: str = DEFAULT_TENANT):
 
-    if not os.path.exists(constants.DOCS_PATH):
-        os.makedirs(constants.DOCS_PATH)
-        print(f"{constants.BUILD} - Created recipes directory: {constants.DOCS_PATH}")
-    # Trigger the static update method
-    success = kb_manager.KnowledgeBaseManager.update_kb()
-    if not success:
-        print("FATAL: Failed to create initial vector store. RAG Engine might not work.")
-
-
-rag_engine_instance = RAGEngine()
-print(f"{constants.BUILD} - RAG Engine instance created.")
-
-def get_rag_response(user_question: str, serializable_chat_history: list, selected_recipe_filename: str | None = None):
-
-    if not rag_engine_instance:
-        print("Error: RAG Engine instance is not available.")
+    try:
+        rag_engine = tenant_registry.get_engine(tenant_id)
+    except Exception as e:
+        print(f"Error: RAG Engine for tenant '{tenant_id}' is not available: {e}")
         return "Sorry, the recipe query engine is not initialized properly."
 
-    return rag_engine_instance.query(user_question, serializable_chat_history, selected_recipe_filename)
+    if rag_engine is None:
+        print(f"Unknown tenant '{tenant_id}'. No recipes have been uploaded for it.")
+        return "Sorry, there are no recipes for this household yet. Upload one to get started."
 
-def list_recipes():
-    """Lists the recipe files in the DOCS_PATH directory."""
+    return rag_engine.query(user_question, serializable_chat_history, selected_recipe_filename)
+
+def list_recipes(tenant_id: str = DEFAULT_TENANT):
+    """Lists the recipe files in the tenant's recipes directory."""
+    docs_path = tenant_docs_path(tenant_id)
     try:
-        if not os.path.exists(constants.DOCS_PATH):
-             print(f"Recipes directory '{constants.DOCS_PATH}' not found. Returning empty list.")
+        if not os.path.exists(docs_path):
+             print(f"Recipes directory '{docs_path}' not found. Returning empty list.")
              return []
-        recipe_files = glob.glob(os.path.join(constants.DOCS_PATH, "*.json"))
+        recipe_files = glob.glob(os.path.join(docs_path, "*.json"))
         return [os.path.basename(f) for f in recipe_files]
     except Exception as e:
         print(f"Error listing recipes: {e}")
         return []
-
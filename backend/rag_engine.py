@@ -8,14 +8,17 @@ import constants as constants
 import kb_manager # Import the refactored knowledge base manager
 
 class RAGEngine:
-    def __init__(self):
-        print("Initializing RAGEngine...")
-        self.llm = self._initialize_llm()
+    def __init__(self, vectorstore_path=constants.VECTORSTORE_PATH, llm=None):
+        print(f"Initializing RAGEngine for '{vectorstore_path}'...")
+        self.vectorstore_path = vectorstore_path
+        # Engines for different tenants can share one LLM client
+        self.llm = llm if llm is not None else self.initialize_llm()
         self.vectorstore = None
         self.rag_chain = None
         self.reload_vectorstore() # Load initial vector store and build chain
 
-    def _initialize_llm(self):
+    @staticmethod
+    def initialize_llm():
         """Initializes the Language Model."""
         print(f"Initializing LLM: {constants.LLM_MODEL_NAME}")
         try:
@@ -30,15 +33,15 @@ class RAGEngine:
             print(f"Error initializing LLM: {e}")
             raise # Re-raise exception to prevent engine from starting in a bad state
 
-    def _build_rag_chain(self):
-        """Builds the RAG chain using the current vector store. This method should be called after a vector store update"""
-        if not self.vectorstore:
+    def _build_rag_chain(self, vectorstore):
+        """Builds the RAG chain on top of the given vector store. This method should be called after a vector store update"""
+        if not vectorstore:
             print("Error: Cannot build RAG chain without a loaded vector store.")
             return None
 
         print("Building RAG chain...")
         try:
-            retriever = self.vectorstore.as_retriever(search_kwargs={'k': 3})
+            retriever = vectorstore.as_retriever(search_kwargs={'k': 3})
 
             contextualize_q_system_prompt = """Given a chat history and the latest user question \
             which might reference context in the chat history, formulate a standalone question \
@@ -91,23 +94,29 @@ class RAGEngine:
             return None # Return None if chain building fails
 
     def reload_vectorstore(self):
-        """Reloads the vector store from disk and rebuilds the RAG chain."""
-        print("Attempting to reload vector store...")
+        """Reloads the vector store from disk and rebuilds the RAG chain.
+
+        The new store and chain are built off to the side and then published together,
+        so queries already running keep using the previous chain until they finish.
+        """
+        print(f"Attempting to reload vector store from '{self.vectorstore_path}'...")
         # Load vector store from disk - ensuring consistency
-        self.vectorstore = kb_manager.KnowledgeBaseManager.load_vectorstore(constants.VECTORSTORE_PATH)
-        if self.vectorstore:
+        vectorstore = kb_manager.KnowledgeBaseManager.load_vectorstore(self.vectorstore_path)
+        if vectorstore:
             print("Vector store reloaded. Rebuilding RAG chain...")
-            self.rag_chain = self._build_rag_chain()
+            rag_chain = self._build_rag_chain(vectorstore)
         else:
             print("Failed to reload vector store. RAG chain might be outdated or non-functional.")
-            self.rag_chain = None # Ensure chain is None if vectorstore failed to load
+            rag_chain = None # Ensure chain is None if vectorstore failed to load
+        self.vectorstore, self.rag_chain = vectorstore, rag_chain
 
     def query(self, user_question: str, serializable_chat_history: list, selected_recipe_filename: str | None = None):
         """
         Processes a user question using the RAG chain.
         Updates the serializable chat history in place.
         """
-        if not self.rag_chain:
+        rag_chain = self.rag_chain # Snapshot so a concurrent reload cannot swap it mid-query
+        if not rag_chain:
             print("Error: RAG chain is not available. Cannot process query.")
             # Ensure history is not modified if we can't process
             return "Sorry, the recipe query engine is not available right now."
@@ -128,7 +137,7 @@ class RAGEngine:
 
         try:
             print(f"Invoking RAG chain with question: '{effective_question[:50]}...'") # Log truncated question
-            response = self.rag_chain.invoke({
+            response = rag_chain.invoke({
                 "input": effective_question,
                 "chat_history": langchain_chat_history
             })
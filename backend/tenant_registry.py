@@ -0,0 +1,198 @@
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import constants as constants
+import kb_manager
+from rag_engine import RAGEngine
+
+# The default tenant keeps the original single-tenant paths so existing deployments keep their data
+DEFAULT_TENANT = "default"
+# Tenant ids end up in filesystem paths, so only allow a conservative character set
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Optional overrides in constants.py
+TENANTS_PATH = getattr(constants, "TENANTS_PATH", "tenants")
+TENANT_CACHE_MAX_BYTES = getattr(constants, "TENANT_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+# Every loaded engine counts at least this much, so tenants with empty stores are evicted too
+TENANT_MIN_ENGINE_BYTES = getattr(constants, "TENANT_MIN_ENGINE_BYTES", 1024 * 1024)
+
+
+def is_valid_tenant_id(tenant_id) -> bool:
+    """Checks that the tenant id is safe to use as a directory name."""
+    return isinstance(tenant_id, str) and bool(TENANT_ID_PATTERN.match(tenant_id))
+
+def tenant_docs_path(tenant_id: str) -> str:
+    """Returns the folder holding the tenant's recipe JSON files."""
+    if tenant_id == DEFAULT_TENANT:
+        return constants.DOCS_PATH
+    return os.path.join(TENANTS_PATH, tenant_id, "recipes")
+
+def tenant_vectorstore_path(tenant_id: str) -> str:
+    """Returns the folder holding the tenant's FAISS vector store."""
+    if tenant_id == DEFAULT_TENANT:
+        return constants.VECTORSTORE_PATH
+    return os.path.join(TENANTS_PATH, tenant_id, "vectorstore")
+
+def tenant_exists(tenant_id: str) -> bool:
+    """A tenant exists once its recipes folder has been created (the default tenant always exists)."""
+    return tenant_id == DEFAULT_TENANT or os.path.isdir(tenant_docs_path(tenant_id))
+
+def _vectorstore_size(kb_path: str) -> int:
+    """Approximates the in-memory footprint of a loaded store by its size on disk."""
+    total = 0
+    if not os.path.isdir(kb_path):
+        return total
+    for entry in os.scandir(kb_path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+class TenantRegistry:
+    """Loads tenant RAG engines on demand and keeps the most recently used ones in memory.
+
+    Loaded engines are kept in LRU order and the coldest ones are evicted once their combined
+    vector store size (at least min_engine_bytes each) goes over max_bytes. The most recently
+    used engine is never evicted, even if it alone exceeds the budget. Tenants are never created
+    here: only tenants whose recipes folder exists are loaded.
+    """
+
+    def __init__(self, max_bytes=TENANT_CACHE_MAX_BYTES, min_engine_bytes=TENANT_MIN_ENGINE_BYTES):
+        self.max_bytes = max_bytes
+        self.min_engine_bytes = min_engine_bytes
+        self._engines = OrderedDict() # tenant_id -> (RAGEngine, accounted size in bytes), oldest first
+        self._loaded_bytes = 0
+        self._lock = threading.Lock() # Guards _engines, _loaded_bytes and _tenant_locks
+        self._tenant_locks = {} # tenant_id -> [lock, holders]; dropped once nobody holds or waits
+        self._llm = None # Shared by every engine, created on first load
+        self._llm_lock = threading.Lock()
+
+    @contextmanager
+    def _tenant_lock(self, tenant_id):
+        """Holds the lock serialising loads and rebuilds of a single tenant."""
+        with self._lock:
+            entry = self._tenant_locks.get(tenant_id)
+            if entry is None:
+                entry = self._tenant_locks[tenant_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._tenant_locks[tenant_id]
+
+    def _shared_llm(self):
+        """Returns the LLM client shared by all engines, creating it once."""
+        with self._llm_lock:
+            if self._llm is None:
+                self._llm = RAGEngine.initialize_llm()
+            return self._llm
+
+    def _lookup(self, tenant_id):
+        with self._lock:
+            entry = self._engines.get(tenant_id)
+            if entry is None:
+                return None
+            self._engines.move_to_end(tenant_id)
+            return entry[0]
+
+    def _store(self, tenant_id, engine, only_if_loaded=False):
+        """Inserts or refreshes a loaded engine and evicts cold tenants over the memory budget.
+
+        With only_if_loaded, the engine is only refreshed if it is still the one cached for the
+        tenant, so an engine evicted in the meantime is not brought back.
+        """
+        size = max(_vectorstore_size(engine.vectorstore_path), self.min_engine_bytes)
+        with self._lock:
+            if only_if_loaded:
+                current = self._engines.get(tenant_id)
+                if current is None or current[0] is not engine:
+                    return
+            previous = self._engines.pop(tenant_id, None)
+            if previous is not None:
+                self._loaded_bytes -= previous[1]
+            self._engines[tenant_id] = (engine, size)
+            self._loaded_bytes += size
+            while self._loaded_bytes > self.max_bytes and len(self._engines) > 1:
+                evicted_id, (_, evicted_size) = self._engines.popitem(last=False)
+                self._loaded_bytes -= evicted_size
+                print(f"Evicted tenant '{evicted_id}' from memory ({evicted_size} bytes).")
+
+    def get_engine(self, tenant_id: str) -> RAGEngine | None:
+        """Returns the tenant's engine, building and loading its vector store if needed.
+
+        Returns None for unknown tenants; nothing is created on disk for them.
+        """
+        engine = self._lookup(tenant_id)
+        if engine is not None:
+            return engine
+        if not tenant_exists(tenant_id):
+            return None
+
+        # Only this tenant waits while it is loaded; other tenants keep being served
+        with self._tenant_lock(tenant_id):
+            engine = self._lookup(tenant_id)
+            if engine is not None:
+                return engine
+
+            docs_path = tenant_docs_path(tenant_id)
+            kb_path = tenant_vectorstore_path(tenant_id)
+            if not os.path.exists(kb_path) or not os.listdir(kb_path):
+                print(f"Vector store for tenant '{tenant_id}' not found at '{kb_path}'. Building initial store...")
+                if not kb_manager.KnowledgeBaseManager.update_kb(kb_path, docs_path):
+                    print(f"Failed to create initial vector store for tenant '{tenant_id}'.")
+
+            engine = RAGEngine(kb_path, llm=self._shared_llm())
+            self._store(tenant_id, engine)
+            return engine
+
+    def rebuild(self, tenant_id: str) -> bool:
+        """Rebuilds the tenant's vector store from its recipe files and reloads it if it is in memory."""
+        if not tenant_exists(tenant_id):
+            print(f"Tenant '{tenant_id}' has no recipes folder. Nothing to rebuild.")
+            return False
+        with self._tenant_lock(tenant_id):
+            success = kb_manager.KnowledgeBaseManager.update_kb(
+                tenant_vectorstore_path(tenant_id), tenant_docs_path(tenant_id)
+            )
+            self._reload_locked(tenant_id)
+            return success
+
+    def remove_vectorstore(self, tenant_id: str) -> bool:
+        """Deletes the tenant's vector store from disk and evicts its engine. Returns whether a store existed.
+
+        The next get_engine for the tenant rebuilds the store from its recipe files.
+        """
+        kb_path = tenant_vectorstore_path(tenant_id)
+        with self._tenant_lock(tenant_id):
+            store_existed = os.path.exists(kb_path)
+            try:
+                if store_existed:
+                    shutil.rmtree(kb_path)
+            finally:
+                self.evict(tenant_id)
+            return store_existed
+
+    def evict(self, tenant_id: str):
+        """Drops the tenant's engine from memory. In-flight queries finish on the old engine."""
+        with self._lock:
+            entry = self._engines.pop(tenant_id, None)
+            if entry is not None:
+                self._loaded_bytes -= entry[1]
+
+    def _reload_locked(self, tenant_id):
+        # Caller must hold the tenant lock
+        with self._lock:
+            entry = self._engines.get(tenant_id)
+        if entry is None:
+            return # Not loaded; the next get_engine reads the fresh store from disk
+        engine = entry[0]
+        engine.reload_vectorstore()
+        self._store(tenant_id, engine, only_if_loaded=True)
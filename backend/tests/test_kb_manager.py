@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+import kb_manager
+from kb_manager import KnowledgeBaseManager
+
+
+class FakeVectorStore:
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.faiss"), "w") as f:
+            f.write("new")
+
+
+class FakeFAISS:
+    fail = False
+
+    @classmethod
+    def from_documents(cls, documents, embeddings):
+        if cls.fail:
+            raise RuntimeError("embedding failed")
+        return FakeVectorStore()
+
+
+@pytest.fixture
+def kb_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_manager, "FAISS", FakeFAISS)
+    monkeypatch.setattr(kb_manager, "Document", lambda page_content, metadata: page_content)
+    monkeypatch.setattr(kb_manager, "get_embeddings", lambda: None)
+    FakeFAISS.fail = False
+
+    docs_path = tmp_path / "recipes"
+    docs_path.mkdir()
+    (docs_path / "soup.json").write_text(json.dumps({"name": "Soup", "steps": []}))
+    kb_path = tmp_path / "vectorstore"
+    kb_path.mkdir()
+    (kb_path / "index.faiss").write_text("old")
+    return tmp_path, str(kb_path), str(docs_path)
+
+
+def test_failed_build_keeps_old_store(kb_dirs):
+    tmp_path, kb_path, docs_path = kb_dirs
+    FakeFAISS.fail = True
+
+    assert KnowledgeBaseManager.update_kb(kb_path, docs_path) is False
+    with open(os.path.join(kb_path, "index.faiss")) as f:
+        assert f.read() == "old"
+    assert sorted(os.listdir(tmp_path)) == ["recipes", "vectorstore"]
+
+
+@pytest.mark.parametrize("suffix", ["", os.sep])
+def test_build_replaces_old_store(kb_dirs, suffix):
+    tmp_path, kb_path, docs_path = kb_dirs
+
+    assert KnowledgeBaseManager.update_kb(kb_path + suffix, docs_path) is True
+    with open(os.path.join(kb_path, "index.faiss")) as f:
+        assert f.read() == "new"
+    assert os.listdir(kb_path) == ["index.faiss"]
+    assert sorted(os.listdir(tmp_path)) == ["recipes", "vectorstore"]
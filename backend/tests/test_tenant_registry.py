@@ -0,0 +1,177 @@
+import os
+import threading
+
+import pytest
+
+import tenant_registry
+from tenant_registry import TenantRegistry
+
+
+class FakeEngine:
+    llm_clients = 0
+
+    def __init__(self, vectorstore_path, llm=None):
+        self.vectorstore_path = vectorstore_path
+        self.llm = llm
+        self.reloads = 0
+        self.on_reload = None
+
+    @staticmethod
+    def initialize_llm():
+        FakeEngine.llm_clients += 1
+        return object()
+
+    def reload_vectorstore(self):
+        self.reloads += 1
+        if self.on_reload:
+            self.on_reload()
+
+
+@pytest.fixture
+def store_sizes(tmp_path, monkeypatch):
+    """Points the registry at tmp_path and fakes update_kb; maps tenant id -> index size to write."""
+    sizes = {}
+    monkeypatch.setattr(tenant_registry, "TENANTS_PATH", str(tmp_path / "tenants"))
+    monkeypatch.setattr(tenant_registry.constants, "DOCS_PATH", str(tmp_path / "recipes"), raising=False)
+    monkeypatch.setattr(tenant_registry.constants, "VECTORSTORE_PATH", str(tmp_path / "vectorstore"), raising=False)
+    monkeypatch.setattr(tenant_registry, "RAGEngine", FakeEngine)
+    FakeEngine.llm_clients = 0
+
+    def fake_update_kb(kb_path, ground_truth_path):
+        os.makedirs(kb_path, exist_ok=True)
+        tenant_id = os.path.basename(os.path.dirname(kb_path))
+        with open(os.path.join(kb_path, "index.faiss"), "wb") as f:
+            f.write(b"x" * sizes.get(tenant_id, 0))
+        return True
+
+    monkeypatch.setattr(tenant_registry.kb_manager.KnowledgeBaseManager, "update_kb", staticmethod(fake_update_kb))
+    return sizes
+
+
+def add_tenant(tenant_id, sizes=None, size=0):
+    os.makedirs(tenant_registry.tenant_docs_path(tenant_id), exist_ok=True)
+    if sizes is not None:
+        sizes[tenant_id] = size
+
+
+def test_evicts_least_recently_used_over_budget(store_sizes):
+    registry = TenantRegistry(max_bytes=250, min_engine_bytes=1)
+    for tenant_id in ("a", "b", "c"):
+        add_tenant(tenant_id, store_sizes, 100)
+
+    a = registry.get_engine("a")
+    registry.get_engine("b")
+    assert registry.get_engine("a") is a # Touching a makes b the coldest
+    registry.get_engine("c")
+
+    assert list(registry._engines) == ["a", "c"]
+    assert registry._loaded_bytes == 200
+
+
+def test_never_evicts_most_recent_engine(store_sizes):
+    registry = TenantRegistry(max_bytes=50, min_engine_bytes=1)
+    add_tenant("big", store_sizes, 100)
+    add_tenant("small", store_sizes, 10)
+
+    registry.get_engine("big")
+    assert list(registry._engines) == ["big"]
+    assert registry._loaded_bytes == 100
+
+    registry.get_engine("small")
+    assert list(registry._engines) == ["small"]
+    assert registry._loaded_bytes == 10
+
+
+def test_empty_stores_count_towards_budget(store_sizes):
+    registry = TenantRegistry(max_bytes=10, min_engine_bytes=5)
+    for i in range(5):
+        add_tenant(f"t{i}")
+        registry.get_engine(f"t{i}")
+
+    assert list(registry._engines) == ["t3", "t4"]
+    assert registry._loaded_bytes == 10
+
+
+def test_unknown_tenant_is_not_created(store_sizes, tmp_path):
+    registry = TenantRegistry()
+
+    assert registry.get_engine("stranger") is None
+    assert registry.rebuild("stranger") is False
+    assert not os.path.exists(tmp_path / "tenants")
+    assert not registry._engines
+    assert not registry._tenant_locks
+
+
+def test_tenant_locks_are_released(store_sizes):
+    registry = TenantRegistry()
+    add_tenant("a")
+    registry.get_engine("a")
+    registry.rebuild("a")
+    assert registry._tenant_locks == {}
+
+
+def test_rebuild_does_not_block_other_tenants(store_sizes, monkeypatch):
+    registry = TenantRegistry()
+    add_tenant("a")
+    add_tenant("b")
+    registry.get_engine("a")
+
+    started, release = threading.Event(), threading.Event()
+    update_kb = tenant_registry.kb_manager.KnowledgeBaseManager.update_kb
+
+    def slow_update_kb(kb_path, ground_truth_path):
+        if kb_path == tenant_registry.tenant_vectorstore_path("a"):
+            started.set()
+            release.wait(5)
+        return update_kb(kb_path, ground_truth_path)
+
+    monkeypatch.setattr(tenant_registry.kb_manager.KnowledgeBaseManager, "update_kb", staticmethod(slow_update_kb))
+    rebuild = threading.Thread(target=registry.rebuild, args=("a",))
+    rebuild.start()
+    try:
+        assert started.wait(5)
+        # b's first load builds its store while a's rebuild still holds a's lock
+        assert registry.get_engine("b") is not None
+        assert registry.get_engine("a") is not None # a's previous engine keeps serving
+    finally:
+        release.set()
+        rebuild.join(5)
+    assert registry._engines["a"][0].reloads == 1
+
+
+def test_reload_does_not_restore_evicted_engine(store_sizes):
+    registry = TenantRegistry()
+    add_tenant("a")
+    add_tenant("b")
+    a = registry.get_engine("a")
+    registry.get_engine("b")
+    a.on_reload = lambda: registry.evict("a")
+
+    registry.rebuild("a")
+
+    assert list(registry._engines) == ["b"]
+
+
+def test_remove_vectorstore_evicts_engine(store_sizes):
+    registry = TenantRegistry()
+    add_tenant("a", store_sizes, 10)
+    first = registry.get_engine("a")
+
+    assert registry.remove_vectorstore("a") is True
+    assert not os.path.exists(tenant_registry.tenant_vectorstore_path("a"))
+    assert "a" not in registry._engines
+    assert registry._loaded_bytes == 0
+    # The next request rebuilds the store, whether or not the tenant was cached
+    assert registry.get_engine("a") is not first
+    assert os.path.exists(tenant_registry.tenant_vectorstore_path("a"))
+
+
+def test_llm_client_is_shared(store_sizes):
+    registry = TenantRegistry()
+    add_tenant("a")
+    add_tenant("b")
+    a = registry.get_engine("a")
+    b = registry.get_engine("b")
+
+    assert FakeEngine.llm_clients == 1
+    assert a.llm is b.llm